@@ -0,0 +1,43 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from diskcache import Cache
+
+from docetl.operations.utils import DOCETL_HOME_DIR
+
+AGENT_LLM_CACHE_DIR = os.path.join(DOCETL_HOME_DIR, "agent_llm_cache")
+agent_llm_cache = Cache(AGENT_LLM_CACHE_DIR)
+agent_llm_cache.close()
+
+
+def cache_key(
+    model: str,
+    system_prompt: str,
+    messages: List[Dict[str, str]],
+    parameters: Dict[str, Any],
+) -> str:
+    """
+    Compute a stable cache key for an agent LLM call.
+
+    The key is a BLAKE2b hash over the model, system prompt, messages, and
+    response schema, so identical calls across repeat optimizer runs hit the
+    cache regardless of process or machine state.
+    """
+    key_material = json.dumps(
+        [model, system_prompt, messages, parameters], sort_keys=True
+    )
+    return hashlib.blake2b(key_material.encode()).hexdigest()
+
+
+def get_cached_response(key: str) -> Optional[Any]:
+    """Return the cached LLM response for the given key, or None on a miss."""
+    with agent_llm_cache as c:
+        return c.get(key)
+
+
+def set_cached_response(key: str, response: Any) -> None:
+    """Store an LLM response under the given key."""
+    with agent_llm_cache as c:
+        c.set(key, response)
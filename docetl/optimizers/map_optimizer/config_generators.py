@@ -1,8 +1,11 @@
-import copy
+import asyncio
+import functools
 import json
 import random
-from typing import Any, Dict, List, Tuple
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from rich.console import Console
 
 from docetl.optimizers.map_optimizer.utils import generate_and_validate_prompt
@@ -10,6 +13,64 @@ from docetl.optimizers.utils import LLMClient
 from docetl.utils import extract_jinja_variables
 
 
+try:
+    import orjson
+
+    def _dumps_indented(obj: Any) -> str:
+        """Serialize to indented JSON with orjson (3-10x faster than stdlib)."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+except ImportError:
+
+    def _dumps_indented(obj: Any) -> str:
+        """Serialize to indented JSON with the stdlib fallback."""
+        return json.dumps(obj, indent=2)
+
+
+# Matches a {{ variable }} reference in a Jinja template
+_JINJA_VARIABLE_RE = re.compile(r"\{\{\s*([^}\s]+)\s*\}\}")
+
+_WORD_RE = re.compile(r"\S+")
+
+# Keywords that almost always signal a subtask needs surrounding context
+_CONTEXT_KEYWORD_RE = re.compile(
+    r"\b(previous|overall|entire|throughout|document|summary|across)\b", re.IGNORECASE
+)
+
+# Keywords that almost always signal a subtask relies on document metadata
+_METADATA_KEYWORD_RE = re.compile(
+    r"\b(title|heading|header|author|section)\b", re.IGNORECASE
+)
+
+
+def _word_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Return the (start, end) character offsets of each word in `text`.
+
+    Walking word boundaries with a compiled regex stores two integers per word
+    instead of materializing a string object per word the way `str.split`
+    does, and lets callers slice a chunk out of the original text directly.
+    """
+    return [match.span() for match in _WORD_RE.finditer(text)]
+
+
+def _slice_words(text: str, spans: List[Tuple[int, int]], start: int, end: int) -> str:
+    """Return the substring of `text` covering words [start, end)."""
+    if not spans or start >= len(spans) or end <= start:
+        return ""
+    return text[spans[start][0] : spans[min(end, len(spans)) - 1][1]]
+
+
+def word_count(text: str) -> int:
+    """
+    Count the number of whitespace-delimited words in a string.
+
+    Equivalent to `len(text.split())` but driven by a precompiled regex, so it
+    handles any whitespace (including newline-delimited text) correctly.
+    """
+    return len(_WORD_RE.findall(text))
+
+
 class ConfigGenerator:
     def __init__(
         self,
@@ -22,108 +83,329 @@ class ConfigGenerator:
         self.console = console
         self.config = config
         self.max_threads = max_threads
+        # Serialized output schemas, keyed by op name and stored with a
+        # fingerprint of the schema so edits invalidate the entry
+        self._output_schema_json: Dict[str, Tuple[str, str]] = {}
+        # Combined analysis results, keyed by op name, stored with a
+        # fingerprint of the op config so edits invalidate the entry
+        self._combined_cache: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+    def _get_output_schema_json(self, op_config: Dict[str, Any]) -> str:
+        """
+        Serialize the op's output schema to indented JSON, memoized per op.
+
+        The memo is fingerprinted on the schema content, mirroring
+        `_combined_cache`, so a schema edited under the same op name is
+        re-serialized instead of served stale.
+        """
+        schema = op_config["output"]["schema"]
+        fingerprint = json.dumps(schema, sort_keys=True, default=str)
+        cached = self._output_schema_json.get(op_config["name"])
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        schema_json = _dumps_indented(schema)
+        self._output_schema_json[op_config["name"]] = (fingerprint, schema_json)
+        return schema_json
 
     # Configuration and analysis methods
 
-    def _get_split_config(
+    async def analyze_op(
         self,
         op_config: Dict[str, Any],
         input_data_sample: List[Dict[str, Any]],
+        token_limit: int,
     ) -> Dict[str, Any]:
         """
-        Generate a configuration for splitting the input data and processing chunks.
+        Run the full chunking analysis for an operation.
 
-        This method analyzes the operation configuration and a sample of the input data
-        to determine an appropriate split key and subprompt for processing chunks of the
-        input data. It uses the LLM to generate a suitable configuration based on the
-        operation's requirements and the structure of the input data.
+        The split configuration, metadata necessity, and context needs are
+        obtained from a single combined LLM request (see
+        `_analyze_op_combined`); only the metadata-extraction prompt, when
+        needed, costs an additional call. That call is retried once on
+        failure and then falls back to skipping metadata.
 
         Args:
             op_config (Dict[str, Any]): The configuration of the operation.
             input_data_sample (List[Dict[str, Any]]): A sample of the input data.
+            token_limit (int): The maximum number of tokens allowed in the operation's input.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing:
+                - 'split' (Dict): The finalized split configuration.
+                - 'chunk_sizes' (List[int]): The candidate chunk sizes.
+                - 'metadata' (Dict): The metadata needs for the average chunk size.
+                - 'context' (Dict): The context needs; chunk-size agnostic.
+        """
+        combined = await self._analyze_op_combined(op_config, input_data_sample)
+        split_result = combined["split"]
+        split_key = split_result["split_key"]
+        subprompt = split_result["subprompt"]
+
+        chunk_sizes = self._generate_chunk_sizes(
+            split_key, input_data_sample, token_limit
+        )
+        avg_chunk_size = sum(chunk_sizes) // len(chunk_sizes)
+
+        metadata_info = combined["metadata"]
+        if metadata_info["needs_metadata"]:
+            try:
+                metadata_info = await self._get_metadata_config(
+                    op_config, subprompt, avg_chunk_size, split_key, input_data_sample
+                )
+            except Exception as e:
+                self.console.log(
+                    f"[yellow]Error determining metadata needs: {e}. Retrying...[/yellow]"
+                )
+                try:
+                    # Retry once
+                    metadata_info = await self._get_metadata_config(
+                        op_config,
+                        subprompt,
+                        avg_chunk_size,
+                        split_key,
+                        input_data_sample,
+                    )
+                except Exception:
+                    # Silently fail on second attempt
+                    metadata_info = {"needs_metadata": False}
+
+        return {
+            "split": split_result,
+            "chunk_sizes": chunk_sizes,
+            "metadata": metadata_info,
+            # Copied so callers can't mutate the cached combined result
+            "context": dict(combined["context"]),
+        }
+
+    async def _analyze_op_combined(
+        self,
+        op_config: Dict[str, Any],
+        input_data_sample: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Run the split, metadata-necessity, and context analyses in one LLM call.
+
+        The analyses share almost all of their context (the op config and an
+        input sample), so folding them into a single request avoids paying
+        that prefill once per analysis. The static keyword heuristics are
+        consulted first: a question they can answer is dropped from the
+        request entirely. Results are cached per op name, with a fingerprint
+        of the op config so edits invalidate the entry. The context answer
+        here is chunk-size agnostic.
 
         Returns:
-            Dict[str, Any]: A dictionary containing the split configuration, including:
-                - split_key (str): The key in the input data to be used for splitting.
-                - subprompt (str): A Jinja template prompt to be applied to each chunk.
-
-        Note:
-            - The split_key is determined based on the structure of the input data.
-            - The subprompt is designed to process individual chunks of the split data.
-            - The subprompt's output schema matches the original operation's output schema.
-            - In the subprompt, we've replace all variables of 'input.{split_key}' with 'input.{split_key}_chunk'.
+            Dict[str, Any]: A dictionary with 'split' (a finalized split
+            configuration), 'metadata' (`needs_metadata`/`reason`), and
+            'context' (`needs_peripherals`, the four context flags, and
+            `reason`).
         """
+        fingerprint = json.dumps(op_config, sort_keys=True, default=str)
+        cached = self._combined_cache.get(op_config["name"])
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        # Cheap static pre-checks: the best LLM question is the one never
+        # asked. The subprompt is derived from the op's prompt, so the
+        # keyword signals carry over.
+        op_prompt = op_config.get("prompt", "")
+        metadata_heuristic = self._needs_metadata_heuristic(op_prompt)
+        context_heuristic = self._needs_context_heuristic(op_prompt)
 
         system_prompt = "You are an AI assistant tasked with configuring split operations for data processing."
 
         random_sample = random.choice(input_data_sample) if input_data_sample else {}
 
-        # Extract Jinja variables from the prompt
-        variables_in_prompt = extract_jinja_variables(op_config.get("prompt", ""))
-
-        # Remove 'input.' prefix from variable names
-        variables_in_prompt = [v.replace("input.", "") for v in variables_in_prompt]
+        variables_in_prompt = {
+            v.replace("input.", "") for v in extract_jinja_variables(op_prompt)
+        }
 
-        # Subselect variables in random_sample based on Jinja variables in the prompt
         random_sample = {
             k: v for k, v in random_sample.items() if k in variables_in_prompt
         }
 
-        output_schema = op_config["output"]["schema"]
+        schema_json = self._get_output_schema_json(op_config)
+
+        analyses = [
+            """Determine the split key and subprompt for processing chunks of the input data.
+        The split key should be a key in the input data that contains a string to be split.
+        The subprompt should be designed to process individual chunks of the split data.
+        Note that the subprompt's output schema might be different from the original operation's output schema, since you may want to extract more information or make the information less structured/more free text. The original output schema will be preserved when combining the chunks' processed results.
+        The subprompt should be a Jinja template that uses the variable 'input.{{ split_key }}_chunk_rendered' instead of 'input.{{ split_key }}'."""
+        ]
+        response_format = [
+            "- split_key: The key in the input data to be used for splitting",
+            "- subprompt: The Jinja template prompt to be applied to each chunk",
+            "- subprompt_output_schema: The output schema for the subprompt",
+        ]
+        properties: Dict[str, Any] = {
+            "split_key": {"type": "string"},
+            "subprompt": {"type": "string"},
+            "subprompt_output_schema": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": {
+                    "type": "string",
+                    "enum": ["string", "integer", "number", "boolean", "array"],
+                },
+            },
+        }
+
+        if metadata_heuristic is None:
+            analyses.append(
+                "Assuming the document is processed in chunks of a few hundred to a few thousand words, analyze if metadata (e.g., headers) is needed to perform the subtask on each chunk."
+            )
+            response_format.append(
+                "- needs_metadata / metadata_reason: Whether metadata is needed, and why"
+            )
+            properties["needs_metadata"] = {"type": "boolean"}
+            properties["metadata_reason"] = {"type": "string"}
+
+        if context_heuristic is None:
+            analyses.append(
+                "Analyze if peripheral chunks or context is necessary when performing the subtask on a chunk: whether previous context, next context, or both are needed, and whether the head/tail of the entire document is needed as well."
+            )
+            response_format.append(
+                "- needs_peripherals, previous_context, next_context, needs_document_head, needs_document_tail / context_reason: The context needs, and why"
+            )
+            properties["needs_peripherals"] = {"type": "boolean"}
+            properties["previous_context"] = {"type": "boolean"}
+            properties["next_context"] = {"type": "boolean"}
+            properties["needs_document_head"] = {"type": "boolean"}
+            properties["needs_document_tail"] = {"type": "boolean"}
+            properties["context_reason"] = {"type": "string"}
+
+        analyses_text = "\n\n        ".join(
+            f"{number}. {analysis}" for number, analysis in enumerate(analyses, 1)
+        )
+        response_format_text = "\n        ".join(response_format)
 
         prompt = f"""
         Operation Name: {op_config['name']}
         Operation Type: {op_config['type']}
         Current Prompt: {op_config.get('prompt', 'N/A')}
-        Current Output Schema: {json.dumps(output_schema, indent=2)}
+        Current Output Schema: {schema_json}
 
         Input keys: {input_data_sample[0].keys()}
 
         Input Data Sample:
-        {json.dumps(random_sample, indent=2)[:5000]}
+        {_dumps_indented(random_sample)[:5000]}
 
-        Determine the split key and subprompt for processing chunks of the input data.
-        The split key should be a key in the input data that contains a string to be split.
-        The subprompt should be designed to process individual chunks of the split data.
-        Note that the subprompt's output schema might be different from the original operation's output schema, since you may want to extract more information or make the information less structured/more free text. The original output schema will be preserved when combining the chunks' processed results.
+        Perform the following analyses for processing this data in chunks:
 
-        Important:
-        - The subprompt should be a Jinja template.
-        - The subprompt should use the variable 'input.{{ split_key }}_chunk_rendered' instead of 'input.{{ split_key }}'.
+        {analyses_text}
 
         Provide your response in the following format:
-        - split_key: The key in the input data to be used for splitting
-        - subprompt: The Jinja template prompt to be applied to each chunk
-        - subprompt_output_schema: The output schema for the subprompt
+        {response_format_text}
         """
 
         parameters = {
             "type": "object",
-            "properties": {
-                "split_key": {"type": "string"},
-                "subprompt": {"type": "string"},
-                "subprompt_output_schema": {
-                    "type": "object",
-                    "properties": {},
-                    "additionalProperties": {
-                        "type": "string",
-                        "enum": ["string", "integer", "number", "boolean", "array"],
-                    },
-                },
-            },
-            "required": ["split_key", "subprompt", "subprompt_output_schema"],
+            "properties": properties,
+            "required": list(properties),
             "additionalProperties": False,
         }
 
-        response = self.llm_client.generate(
+        response = await self.llm_client.agenerate(
             [
                 {"role": "user", "content": prompt},
             ],
             system_prompt,
             parameters,
+            deterministic=True,
+        )
+        raw = json.loads(response.choices[0].message.content)
+
+        split_result = self._finalize_split_result(
+            {
+                "split_key": raw["split_key"],
+                "subprompt": raw["subprompt"],
+                "subprompt_output_schema": raw["subprompt_output_schema"],
+            },
+            op_config,
+            input_data_sample,
+        )
+
+        if metadata_heuristic is not None:
+            metadata = {
+                "needs_metadata": metadata_heuristic,
+                "reason": "The operation prompt references structural metadata such as titles, headings, or sections (heuristic match).",
+            }
+        else:
+            metadata = {
+                "needs_metadata": raw["needs_metadata"],
+                "reason": raw["metadata_reason"],
+            }
+
+        if context_heuristic is not None:
+            context = self._context_needs_from_heuristic(context_heuristic)
+        else:
+            context = {
+                "needs_peripherals": raw["needs_peripherals"],
+                "previous_context": raw["previous_context"],
+                "next_context": raw["next_context"],
+                "needs_document_head": raw["needs_document_head"],
+                "needs_document_tail": raw["needs_document_tail"],
+                "reason": raw["context_reason"],
+            }
+
+        combined = {
+            "split": split_result,
+            "metadata": metadata,
+            "context": context,
+        }
+
+        self._combined_cache[op_config["name"]] = (fingerprint, combined)
+        return combined
+
+    async def map_configs(
+        self,
+        op_configs: List[Dict[str, Any]],
+        samples: List[List[Dict[str, Any]]],
+        token_limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run `analyze_op` for many operations concurrently.
+
+        Each operation's analysis is independent, and the underlying LLM calls
+        are network-bound, so fanning out with `asyncio.gather` scales
+        throughput with concurrency. The `LLMClient.agenerate` semaphore caps
+        the number of in-flight requests so provider rate limits are respected
+        regardless of how many operations are analyzed at once.
+
+        Args:
+            op_configs (List[Dict[str, Any]]): The operations to analyze.
+            samples (List[List[Dict[str, Any]]]): An input data sample per
+                operation, aligned with `op_configs`.
+            token_limit (int): The maximum number of tokens allowed in each
+                operation's input.
+
+        Returns:
+            List[Dict[str, Any]]: One `analyze_op` result per operation, in
+            the same order as `op_configs`.
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    self.analyze_op(op_config, sample, token_limit)
+                    for op_config, sample in zip(op_configs, samples)
+                )
+            )
         )
-        result = json.loads(response.choices[0].message.content)
 
+    def _finalize_split_result(
+        self,
+        result: Dict[str, Any],
+        op_config: Dict[str, Any],
+        input_data_sample: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Validate and normalize an LLM-produced split configuration.
+
+        Strips the 'input.' prefix from the split key, checks it against the
+        sample, rewrites the subprompt's variables to reference the chunk, and
+        reconciles the subprompt output schema with the op's schema.
+        """
         # Strip out "input." from split_key if it exists
         result["split_key"] = result["split_key"].replace("input.", "")
 
@@ -133,13 +415,13 @@ class ConfigGenerator:
                 f"Split key '{result['split_key']}' not found in the input data sample."
             )
 
-        variables_in_subprompt = extract_jinja_variables(result["subprompt"])
-        # Replace variables in subprompt with f"input.{split_key}_chunk"
-        for variable in variables_in_subprompt:
-            inp_split_key = f"input.{result['split_key']}_chunk_rendered"
-            result["subprompt"] = result["subprompt"].replace(
-                f"{{{{ {variable} }}}}", f"{{{{ {inp_split_key} }}}}"
-            )
+        # Replace all variables in the subprompt with f"input.{split_key}_chunk"
+        # in one pass; a per-variable .replace loop rescans the whole string
+        # for every variable
+        inp_split_key = f"input.{result['split_key']}_chunk_rendered"
+        result["subprompt"] = _JINJA_VARIABLE_RE.sub(
+            f"{{{{ {inp_split_key} }}}}", result["subprompt"]
+        )
 
         # Fix output schema array keys to be list[string]
         for key, value in result["subprompt_output_schema"].items():
@@ -158,125 +440,60 @@ class ConfigGenerator:
 
         return result
 
-    def _determine_metadata_needs(
-        self,
-        op_config: Dict[str, Any],
-        subprompt: str,
-        chunk_size: int,
-        split_key: str,
-        input_data_sample: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
-        needs_metadata = self._check_metadata_necessity(
-            op_config, subprompt, chunk_size, split_key, input_data_sample
-        )
-
-        if needs_metadata["needs_metadata"]:
-            return self._get_metadata_config(
-                op_config, subprompt, chunk_size, split_key, input_data_sample
-            )
-        else:
-            return needs_metadata
-
-    def _check_metadata_necessity(
-        self,
-        op_config: Dict[str, Any],
-        subprompt: str,
-        chunk_size: int,
-        split_key: str,
-        input_data_sample: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
+    @staticmethod
+    def _needs_context_heuristic(prompt: str) -> Optional[bool]:
         """
-        Determine if metadata is necessary for processing document chunks.
-
-        This method analyzes the given operation configuration, subprompt, chunk size,
-        split key, and a sample of input data to decide whether additional metadata
-        is required for accurate processing of document chunks.
-
-        Args:
-            op_config (Dict[str, Any]): The configuration of the original operation.
-            subprompt (str): The prompt to be used for processing individual chunks.
-            chunk_size (int): The size of each chunk in words.
-            split_key (str): The key used to split the input data into chunks.
-            input_data_sample (List[Dict[str, Any]]): A sample of the input data.
+        Try to decide whether a prompt needs peripheral context without an LLM.
 
-        Returns:
-            Dict[str, Any]: A dictionary containing:
-                - 'needs_metadata' (bool): True if metadata is needed, False otherwise.
-                - 'reason' (str): An explanation for why metadata is or isn't needed.
-
-        The method considers several factors to make this determination:
-        1. The nature of the subtask as described in the subprompt.
-        2. The size and content of the chunks.
-        3. The structure and completeness of the input data.
-        4. The potential presence of crucial information in metadata (e.g., headers,
-           document structure) that might not be present in the chunks themselves.
+        Returns True when the prompt mentions words that almost always imply
+        cross-chunk references, False when it is short and references at most
+        one input variable (the content being chunked), and None when the
+        heuristic cannot decide (callers should fall back to the LLM).
         """
-        system_prompt = "You are an AI assistant tasked with determining if metadata is needed for document processing."
-
-        random_sample = random.choice(input_data_sample)[split_key]
-
-        # Get the total number of words in the sample
-        total_words = len(random_sample.split())
-
-        # Ensure we don't start beyond the possible range
-        max_start = max(0, total_words - chunk_size)
-
-        # Choose a random starting point, ensuring a valid range
-        if max_start > chunk_size:
-            start = random.randint(chunk_size, max_start)
-        else:
-            start = 0
-
-        # Extract the chunk
-        words = random_sample.split()[start : start + chunk_size]
-        random_chunk = " ".join(words)
-
-        # Calculate the number of words before and after the chunk
-        num_words_before = start
-        num_words_after = total_words - (start + chunk_size)
-
-        prompt = f"""
-        Given the following subtask prompt:
-        {subprompt}
-
-        And a chunk size of {chunk_size} words, analyze if metadata (e.g., headers) is needed to perform the subtask.
-
-        Here's a random sample chunk of {chunk_size} words from the input:
-        "{random_chunk}"
-
-        There are {num_words_before} words before this chunk and {num_words_after} words after this chunk in the full text.
-
-        Full input sample:
-        {json.dumps(random.choice(input_data_sample), indent=2)[:1000]}
-
-        Determine if metadata is needed to perform the subtask.
-
-        Consider:
-        1. Does the input sample have any structural metadata that might be relevant to the subtask?
-        2. Is the sample chunk or full input missing any crucial information that could be in this metadata?
+        if _CONTEXT_KEYWORD_RE.search(prompt):
+            return True
+
+        variables = {v.replace("input.", "") for v in extract_jinja_variables(prompt)}
+        if len(variables) <= 1 and len(prompt) < 200:
+            return False
+
+        return None
+
+    @staticmethod
+    def _context_needs_from_heuristic(needs_context: bool) -> Dict[str, Any]:
+        """Build a context-needs answer for a heuristic decision."""
+        if needs_context:
+            return {
+                "needs_peripherals": True,
+                "previous_context": True,
+                "next_context": False,
+                "needs_document_head": False,
+                "needs_document_tail": False,
+                "reason": "The operation prompt mentions cross-chunk references (heuristic match), so preceding context is included.",
+            }
+        return {
+            "needs_peripherals": False,
+            "previous_context": False,
+            "next_context": False,
+            "needs_document_head": False,
+            "needs_document_tail": False,
+            "reason": "The operation prompt only references the chunk content (heuristic match).",
+        }
 
-        Provide your response in the following format:
+    @staticmethod
+    def _needs_metadata_heuristic(prompt: str) -> Optional[bool]:
         """
+        Try to decide whether a prompt needs metadata without an LLM.
 
-        parameters = {
-            "type": "object",
-            "properties": {
-                "needs_metadata": {"type": "boolean"},
-                "reason": {"type": "string"},
-            },
-            "required": ["needs_metadata", "reason"],
-        }
-
-        response = self.llm_client.generate(
-            [
-                {"role": "user", "content": prompt},
-            ],
-            system_prompt,
-            parameters,
-        )
-        return json.loads(response.choices[0].message.content)
+        Returns True when the prompt mentions structural metadata (titles,
+        headings, authors, sections), and None otherwise; there is no cheap
+        signal that metadata is definitely unnecessary.
+        """
+        if _METADATA_KEYWORD_RE.search(prompt):
+            return True
+        return None
 
-    def _get_metadata_config(
+    async def _get_metadata_config(
         self,
         op_config: Dict[str, Any],
         subprompt: str,
@@ -296,8 +513,8 @@ class ConfigGenerator:
 
         And a chunk size of {chunk_size} words, create a prompt to extract metadata from each document/input.
 
-        Full input sample:
-        {random_sample}
+        Start of an input sample (metadata like headers typically appears early in the document):
+        {random_sample[:5000]}
 
         Provide a prompt to extract this metadata from each document/input. The extracted metadata should be a string, and your prompt should be a Jinja template that is only allowed to reference the variable `{metadata_var}` and nothing else.
 
@@ -313,7 +530,11 @@ class ConfigGenerator:
             "additionalProperties": False,
         }
 
-        result = generate_and_validate_prompt(
+        # `generate_and_validate_prompt` is synchronous (it also instantiates a
+        # dummy operation to validate the prompt), so run it in a worker thread
+        # to avoid blocking the event loop.
+        result = await asyncio.to_thread(
+            generate_and_validate_prompt,
             self.llm_client,
             base_prompt,
             system_prompt,
@@ -323,91 +544,13 @@ class ConfigGenerator:
             config=self.config,
             max_threads=self.max_threads,
             console=self.console,
+            deterministic=True,
         )
         result["output_schema"] = {"metadata": "str"}
 
         result["needs_metadata"] = True
         return result
 
-    def _determine_context_needs(
-        self,
-        op_config: Dict[str, Any],
-        subprompt: str,
-        chunk_size: int,
-        split_key: str,
-        input_data_sample: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
-        system_prompt = "You are an AI assistant tasked with determining context needs for document chunk processing."
-
-        # Select a random element from input_data_sample
-        sample_input = random.choice(input_data_sample)
-
-        # Extract the content to be chunked
-        content = sample_input[split_key]
-
-        # Split the content into words
-        words = content.split()
-
-        # Calculate the start index for the random chunk
-        start_index = max(0, random.randint(0, len(words) - chunk_size))
-
-        # Extract the random chunk
-        random_chunk = " ".join(words[int(start_index) : int(start_index + chunk_size)])
-
-        # Calculate number of words before and after
-        num_words_before = start_index
-        num_words_after = max(0, len(words) - (start_index + chunk_size))
-
-        prompt = f"""
-        Given the following subtask prompt:
-        {subprompt}
-
-        And a chunk size of {chunk_size} words, analyze if peripheral chunks or context is necessary.
-
-        Here's a random chunk of {chunk_size} words from the input:
-        "{random_chunk}"
-
-        Number of words before the chunk: {num_words_before}
-        Number of words after the chunk: {num_words_after}
-
-        Consider:
-        1. Is this chunk sufficient to perform the specific subtask, or are there ambiguous pronouns/phrases that are relevant to the subtask and require peripheral chunks/context for clarity?
-        2. If peripherals are necessary, do you need previous context, next context, or both?
-        3. Do you need the head/tail of the entire document as well?
-
-        Provide your response in the following format:
-        """
-        # TODO: get the right peripheral chunk sizes here (or experimentally find them)
-
-        parameters = {
-            "type": "object",
-            "properties": {
-                "needs_peripherals": {"type": "boolean"},
-                "previous_context": {"type": "boolean"},
-                "next_context": {"type": "boolean"},
-                "needs_document_head": {"type": "boolean"},
-                "needs_document_tail": {"type": "boolean"},
-                "reason": {"type": "string"},
-            },
-            "required": [
-                "needs_peripherals",
-                "previous_context",
-                "next_context",
-                "needs_document_head",
-                "needs_document_tail",
-                "reason",
-            ],
-        }
-
-        response = self.llm_client.generate(
-            [
-                {"role": "user", "content": prompt},
-            ],
-            system_prompt,
-            parameters,
-        )
-        return json.loads(response.choices[0].message.content)
-
     def _generate_chunk_sizes(
         self,
         split_key: str,
@@ -416,40 +559,31 @@ class ConfigGenerator:
         num_chunks: int = 8,
     ) -> List[int]:
         # Get the average document length
-        avg_doc_length = sum(
-            len(doc[split_key].split()) for doc in input_data_sample
-        ) / len(input_data_sample)
+        avg_doc_length = np.fromiter(
+            (word_count(doc[split_key]) for doc in input_data_sample),
+            dtype=np.int64,
+        ).mean()
 
         # Calculate the word limit based on the token limit
         word_limit = min(int(token_limit * 0.75), int(avg_doc_length))
 
         # Create chunk sizes based on word_limit
         min_chunk_size_word_limit = max(20, int(0.15 * word_limit))
-        word_limit_chunks = [
-            int(
-                min_chunk_size_word_limit
-                + i * (word_limit - min_chunk_size_word_limit) / (num_chunks // 2 - 1)
-            )
-            for i in range(num_chunks // 2)
-        ]
+        word_limit_chunks = np.linspace(
+            min_chunk_size_word_limit, word_limit, num_chunks // 2
+        ).astype(np.int64)
 
-        # Create chunk sizes based on avg_doc_length
+        # Create chunk sizes based on avg_doc_length, capped at word_limit
         min_chunk_size_doc_length = max(20, int(0.15 * avg_doc_length))
-        doc_length_chunks = [
-            min(
-                int(
-                    min_chunk_size_doc_length
-                    + i
-                    * (avg_doc_length - min_chunk_size_doc_length)
-                    / (num_chunks // 2 - 1)
-                ),
-                word_limit,
-            )
-            for i in range(num_chunks // 2)
-        ]
+        doc_length_chunks = np.minimum(
+            np.linspace(
+                min_chunk_size_doc_length, avg_doc_length, num_chunks // 2
+            ).astype(np.int64),
+            word_limit,
+        )
 
         # Combine both lists and remove duplicates
-        all_chunks = sorted(set(word_limit_chunks + doc_length_chunks))
+        all_chunks = sorted(set(word_limit_chunks.tolist() + doc_length_chunks.tolist()))
 
         return all_chunks
 
@@ -457,7 +591,28 @@ class ConfigGenerator:
         self, summary_key: str, chunk_size: int, avg_doc_size: int
     ) -> List[Tuple[Dict[str, Any], bool]]:
         """
-        Generate a list of peripheral chunk configurations, considering:
+        Generate a list of peripheral chunk configurations.
+
+        The generation is pure in its three arguments and the optimizer calls
+        it repeatedly with recurring (chunk_size, avg_doc_size) pairs, so the
+        work is memoized in `_generate_peripheral_configs_cached`. The cached
+        form stores configs as canonical JSON strings; they are deserialized
+        here so every caller gets fresh, independently mutable dicts.
+        """
+        return [
+            (json.loads(config_json), needs_summary)
+            for config_json, needs_summary in self._generate_peripheral_configs_cached(
+                summary_key, chunk_size, avg_doc_size
+            )
+        ]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _generate_peripheral_configs_cached(
+        summary_key: str, chunk_size: int, avg_doc_size: int
+    ) -> Tuple[Tuple[str, bool], ...]:
+        """
+        Generate a tuple of peripheral chunk configurations, considering:
         * Adaptive scaling: this scales the config based on the ratio of document to chunk size
         * Extensive context: this adds a config for when the chunk size is small relative to the document size
 
@@ -479,6 +634,16 @@ class ConfigGenerator:
         providing more context when necessary and less when the chunks are already large relative to the document.
         """
 
+        def _clone_peripheral(config: Dict[str, Any]) -> Dict[str, Any]:
+            # Peripheral configs are small three-level dicts of primitives
+            # ({direction: {part: {count/content_key: ...}}}), so rebuilding
+            # them directly is far cheaper than copy.deepcopy's generic
+            # memoized traversal.
+            return {
+                direction: {part: dict(details) for part, details in parts.items()}
+                for direction, parts in config.items()
+            }
+
         configs = [{}]  # Always include no peripheral context as an option
 
         max_chunks = max(1, avg_doc_size // chunk_size)
@@ -492,7 +657,7 @@ class ConfigGenerator:
         # Scale configurations based on document and chunk size
         scaled_configs = []
         for config in base_configs:
-            scaled_config = copy.deepcopy(config)
+            scaled_config = _clone_peripheral(config)
             for direction in ["previous", "next"]:
                 if direction in scaled_config:
                     for part in scaled_config[direction]:
@@ -521,7 +686,7 @@ class ConfigGenerator:
         if chunk_size < avg_doc_size / 5:
             summary_configs = []
             for config in final_configs:
-                summary_config = copy.deepcopy(config)[0]
+                summary_config = _clone_peripheral(config[0])
                 if "previous" not in summary_config:
                     summary_config["previous"] = {
                         "tail": {"count": 1, "content_key": summary_key}
@@ -530,11 +695,16 @@ class ConfigGenerator:
                 summary_configs.append((summary_config, True))
             final_configs.extend(summary_configs)
 
-        # Deduplicate configs
+        # Deduplicate configs, keying on a canonical JSON form so each config
+        # is hashed once instead of deep-compared against every config seen
+        # so far
+        seen = set()
         unique_configs = []
-        for config in final_configs:
-            if config not in unique_configs:
-                unique_configs.append(config)
-        final_configs = unique_configs
-
-        return final_configs
+        for config, needs_summary in final_configs:
+            config_json = json.dumps(config, sort_keys=True)
+            key = (config_json, needs_summary)
+            if key not in seen:
+                seen.add(key)
+                unique_configs.append((config_json, needs_summary))
+
+        return tuple(unique_configs)
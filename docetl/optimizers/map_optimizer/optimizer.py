@@ -1,3 +1,4 @@
+import asyncio
 import concurrent
 import copy
 import time
@@ -86,6 +87,37 @@ class MapOptimizer:
             runner, llm_client, console, config, max_threads, is_filter
         )
 
+    def analyze_operations(
+        self,
+        op_configs: List[Dict[str, Any]],
+        samples: List[List[Dict[str, Any]]],
+        token_limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the chunking analysis for several operations concurrently.
+
+        Each operation costs one combined LLM request (plus a metadata-prompt
+        request when needed), and the requests for different operations are
+        issued concurrently rather than one at a time. The results are cached
+        per operation, so `optimize` calls on this instance reuse them instead
+        of re-querying the LLM.
+
+        Args:
+            op_configs (List[Dict[str, Any]]): The operation configurations to analyze.
+            samples (List[List[Dict[str, Any]]]): An input data sample per operation.
+            token_limit (int): The maximum number of tokens allowed in an operation's input.
+
+        Returns:
+            List[Dict[str, Any]]: One analysis per operation, in the same order
+            as `op_configs`, each with 'split', 'chunk_sizes', 'metadata', and
+            'context' entries.
+        """
+        return asyncio.run(
+            self.plan_generator.config_generator.map_configs(
+                op_configs, samples, token_limit
+            )
+        )
+
     def should_optimize(self, op_config: Dict[str, Any], input_data: List[Dict[str, Any]]) -> str:
         """
         Determine if the given operation configuration should be optimized.
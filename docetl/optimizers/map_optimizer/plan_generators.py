@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import json
 import random
@@ -6,7 +7,12 @@ from typing import Any, Callable, Dict, List
 
 from rich.console import Console
 
-from docetl.optimizers.map_optimizer.config_generators import ConfigGenerator
+from docetl.optimizers.map_optimizer.config_generators import (
+    ConfigGenerator,
+    _slice_words,
+    _word_spans,
+    word_count,
+)
 from docetl.optimizers.map_optimizer.operation_creators import OperationCreator
 from docetl.optimizers.map_optimizer.prompt_generators import PromptGenerator
 from docetl.optimizers.reduce_optimizer import ReduceOptimizer
@@ -68,7 +74,12 @@ class PlanGenerator:
             that make up the plan.
 
         """
-        split_result = self.config_generator._get_split_config(op_config, input_data)
+        # One combined LLM request covers the split config, metadata
+        # necessity, and context needs for this op
+        op_analysis = asyncio.run(
+            self.config_generator.analyze_op(op_config, input_data, token_limit)
+        )
+        split_result = op_analysis["split"]
         # Generate split keys
         split_key = split_result["split_key"]
         content_key = f"{split_key}_chunk"
@@ -78,46 +89,16 @@ class PlanGenerator:
         if not subprompt_output_schema:
             subprompt_output_schema = op_config["output"]["schema"]
 
-        chunk_sizes = self.config_generator._generate_chunk_sizes(
-            split_key, input_data, token_limit
-        )
+        chunk_sizes = op_analysis["chunk_sizes"]
 
         self.console.log("[bold]Chunk Sizes to Evaluate:[/bold]")
         self.console.log(f"{chunk_sizes}")
 
-        avg_doc_size = sum(len(doc[split_key].split()) for doc in input_data) // len(
+        avg_doc_size = sum(word_count(doc[split_key]) for doc in input_data) // len(
             input_data
         )
-        avg_chunk_size = sum(chunk_sizes) // len(chunk_sizes)
-
-        def determine_metadata_with_retry():
-            try:
-                metadata_info = self.config_generator._determine_metadata_needs(
-                    op_config,
-                    split_result["subprompt"],
-                    avg_chunk_size,
-                    split_key,
-                    input_data,
-                )
-                return metadata_info
-            except Exception as e:
-                self.console.log(
-                    f"[yellow]Error determining metadata needs: {e}. Retrying...[/yellow]"
-                )
-                try:
-                    # Retry once
-                    return self.config_generator._determine_metadata_needs(
-                        op_config,
-                        split_result["subprompt"],
-                        avg_chunk_size,
-                        split_key,
-                        input_data,
-                    )
-                except Exception:
-                    # Silently fail on second attempt
-                    return {"needs_metadata": False}
 
-        metadata_info = determine_metadata_with_retry()
+        metadata_info = op_analysis["metadata"]
         # Print the metadata info
         self.console.log(f"Needs metadata: {metadata_info['needs_metadata']}")
         if metadata_info["needs_metadata"]:
@@ -163,19 +144,16 @@ class PlanGenerator:
 
         # Get 2 consecutive chunks of size min_chunk_size / 2.5 words
         chunk_word_size = int(avg_chunk_size / 2.5)
-        sample_chunks = []
 
-        # Sample the largest element of split_result["split_key"] from input_data
-        largest_input = max(
-            input_data, key=lambda x: len(x[split_result["split_key"]].split())
-        )
+        # Sample the largest element of split_result["split_key"] from
+        # input_data, walking word boundaries once instead of materializing a
+        # word list per document
+        largest_input = max(input_data, key=lambda x: word_count(x[split_key]))
+        largest_content = largest_input[split_key]
+        spans = _word_spans(largest_content)
         sample_chunks = [
-            largest_input[split_result["split_key"]].split()[i : i + chunk_word_size]
-            for i in range(
-                0,
-                len(largest_input[split_result["split_key"]].split()),
-                chunk_word_size,
-            )
+            _slice_words(largest_content, spans, i, i + chunk_word_size)
+            for i in range(0, len(spans), chunk_word_size)
         ]
 
         if not sample_chunks or len(sample_chunks) < 2:
@@ -28,6 +28,7 @@ def generate_and_validate_prompt(
     max_threads: int,
     console: Console,
     inclusion_strings: List = [],
+    deterministic: bool = False,
 ) -> Dict[str, Any]:
     max_retries = 3
     attempt = 0
@@ -41,6 +42,7 @@ def generate_and_validate_prompt(
                 chat_history,
                 system_prompt,
                 parameters,
+                deterministic=deterministic,
             )
             result = json.loads(response.choices[0].message.content)
             for inclusion_string in inclusion_strings:
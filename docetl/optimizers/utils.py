@@ -1,8 +1,14 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
 
-from litellm import completion, completion_cost
+from litellm import acompletion, completion, completion_cost
 
 from docetl.operations.utils import truncate_messages
+from docetl.optimizers.llm_cache import (
+    cache_key,
+    get_cached_response,
+    set_cached_response,
+)
 from docetl.utils import completion_cost
 
 
@@ -14,34 +20,58 @@ class LLMClient:
     and keeps track of the total cost of API calls.
     """
 
-    def __init__(self, model: str = "gpt-4o"):
+    def __init__(self, model: str = "gpt-4o", max_concurrent_requests: int = 10):
         """
         Initialize the LLMClient.
 
         Args:
             model (str, optional): The name of the LLM model to use. Defaults to "gpt-4o".
+            max_concurrent_requests (int, optional): The maximum number of concurrent
+                requests allowed through `agenerate`. Defaults to 10.
         """
         if model == "gpt-4o":
             model = "gpt-4o-2024-08-06"
         self.model = model
         self.total_cost = 0
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _sampling_params(deterministic: bool) -> Dict[str, Any]:
+        """
+        Sampling parameters for a planner call.
+
+        Deterministic calls are pinned to temperature=0 with a fixed seed:
+        their JSON outputs are consumed programmatically, so sampling variance
+        only wastes retries and cache hits.
+        """
+        if deterministic:
+            return {"temperature": 0, "seed": 0}
+        return {}
 
     def generate(
         self,
         messages: List[Dict[str, str]],
         system_prompt: str,
         parameters: Dict[str, Any],
+        deterministic: bool = False,
     ) -> Any:
         """
         Generate a response using the LLM.
 
         This method sends a request to the LLM with the given messages, system prompt,
-        and parameters, and returns the response.
+        and parameters, and returns the response. Responses are always requested
+        with a strict JSON schema (`response_format=json_schema`), so the model
+        cannot emit non-JSON output.
 
         Args:
             messages (List[Dict[str, str]]): A list of message dictionaries to send to the LLM.
             system_prompt (str): The system prompt to use for the generation.
             parameters (Dict[str, Any]): Additional parameters for the LLM request.
+            deterministic (bool, optional): If True, pin temperature and seed
+                so the call is reproducible and served from the disk cache.
+                Defaults to False, which leaves sampling untouched.
 
         Returns:
             Any: The response from the LLM.
@@ -50,6 +80,13 @@ class LLMClient:
 
         messages = truncate_messages(messages, self.model, from_agent=True)
 
+        # Only deterministic calls are sound to serve from the cache
+        if deterministic:
+            key = cache_key(self.model, system_prompt, messages, parameters)
+            cached_response = get_cached_response(key)
+            if cached_response is not None:
+                return cached_response
+
         response = completion(
             model=self.model,
             messages=[
@@ -67,7 +104,80 @@ class LLMClient:
                     "schema": parameters,
                 },
             },
+            **self._sampling_params(deterministic),
         )
         cost = completion_cost(response)
         self.total_cost += cost
+        if deterministic:
+            set_cached_response(key, response)
+        return response
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        parameters: Dict[str, Any],
+        deterministic: bool = False,
+    ) -> Any:
+        """
+        Generate a response using the LLM, asynchronously.
+
+        This is the async counterpart of `generate`, so that independent agent
+        calls can be issued concurrently (e.g. via `asyncio.gather`). A bounded
+        semaphore caps the number of in-flight requests to avoid hammering the
+        provider's rate limits.
+
+        Args:
+            messages (List[Dict[str, str]]): A list of message dictionaries to send to the LLM.
+            system_prompt (str): The system prompt to use for the generation.
+            parameters (Dict[str, Any]): Additional parameters for the LLM request.
+            deterministic (bool, optional): If True, pin temperature and seed
+                so the call is reproducible and served from the disk cache.
+                Defaults to False, which leaves sampling untouched.
+
+        Returns:
+            Any: The response from the LLM.
+        """
+        parameters["additionalProperties"] = False
+
+        messages = truncate_messages(messages, self.model, from_agent=True)
+
+        # Only deterministic calls are sound to serve from the cache
+        if deterministic:
+            key = cache_key(self.model, system_prompt, messages, parameters)
+            cached_response = get_cached_response(key)
+            if cached_response is not None:
+                return cached_response
+
+        # Semaphores are bound to an event loop, and callers typically enter
+        # via `asyncio.run`, so recreate the semaphore if the loop has changed.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self._semaphore_loop = loop
+
+        async with self._semaphore:
+            response = await acompletion(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt,
+                    },
+                    *messages,
+                ],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "output",
+                        "strict": True,
+                        "schema": parameters,
+                    },
+                },
+                **self._sampling_params(deterministic),
+            )
+        cost = completion_cost(response)
+        self.total_cost += cost
+        if deterministic:
+            set_cached_response(key, response)
         return response
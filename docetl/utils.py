@@ -1,6 +1,7 @@
+import functools
 import json
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 from enum import Enum
 import tiktoken
 import yaml
@@ -46,12 +47,18 @@ class CapturedOutput:
 
         self.optimizer_output[self.step][stage_type] = output
 
+# Matches {{ variable }} references, including dotted ones like input.key
+_JINJA_VAR_RE = re.compile(r"{{\s*([\w.]+)\s*}}")
+
+
 def extract_jinja_variables(template_string: str) -> List[str]:
     """
     Extract variables from a Jinja2 template string.
 
     This function uses both Jinja2's AST parsing and regex to find all variables
-    referenced in the given template string, including nested variables.
+    referenced in the given template string, including nested variables. Results
+    are cached per template string, since the optimizer repeatedly extracts
+    variables from the same prompts.
 
     Args:
         template_string (str): The Jinja2 template string to analyze.
@@ -59,6 +66,12 @@ def extract_jinja_variables(template_string: str) -> List[str]:
     Returns:
         List[str]: A list of unique variable names found in the template.
     """
+    # Return a fresh list so callers can't mutate the cached result
+    return list(_extract_jinja_variables_cached(template_string))
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_jinja_variables_cached(template_string: str) -> Tuple[str, ...]:
     # Create a Jinja2 environment
     env = Environment(autoescape=True)
 
@@ -70,7 +83,7 @@ def extract_jinja_variables(template_string: str) -> List[str]:
 
     # Use regex to find any additional variables that might be missed
     # This regex looks for {{ variable }} patterns, including nested ones
-    regex_variables = set(re.findall(r"{{\s*([\w.]+)\s*}}", template_string))
+    regex_variables = set(_JINJA_VAR_RE.findall(template_string))
 
     # Combine both sets of variables
     all_variables = variables.union(regex_variables)
@@ -78,7 +91,7 @@ def extract_jinja_variables(template_string: str) -> List[str]:
     # Special-case: remove "input"
     all_variables.discard("input")
 
-    return list(all_variables)
+    return tuple(all_variables)
 
 
 def completion_cost(response) -> float:
@@ -0,0 +1,105 @@
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from rich.console import Console
+
+from docetl.optimizers.map_optimizer.config_generators import ConfigGenerator
+
+
+@pytest.fixture
+def console():
+    return Console(file=io.StringIO())
+
+
+def _canned_response(payload):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(payload)))]
+    )
+
+
+class StubLLMClient:
+    """Stands in for LLMClient, returning canned combined-analysis answers."""
+
+    def __init__(self, payloads_by_op):
+        self.payloads_by_op = payloads_by_op
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def agenerate(self, messages, system_prompt, parameters, deterministic=False):
+        prompt = messages[0]["content"]
+        op_name = next(
+            name for name in self.payloads_by_op if f"Operation Name: {name}" in prompt
+        )
+        self.calls.append(op_name)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Yield so the other analyses can start before this one finishes
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return _canned_response(self.payloads_by_op[op_name])
+
+
+def _op_config(name, split_key):
+    return {
+        "name": name,
+        "type": "map",
+        "prompt": f"Extract all person names from {{{{ input.{split_key} }}}}.",
+        "output": {"schema": {"names": "list[string]"}},
+    }
+
+
+def _payload(split_key):
+    # The short single-variable prompt lets the context heuristic answer, so
+    # the canned response only covers the split and metadata questions
+    return {
+        "split_key": split_key,
+        "subprompt": f"Extract all person names from {{{{ input.{split_key}_chunk_rendered }}}}.",
+        "subprompt_output_schema": {"names": "array"},
+        "needs_metadata": False,
+        "metadata_reason": "No metadata needed.",
+    }
+
+
+def _sample(split_key):
+    return [{split_key: "word " * 100} for _ in range(3)]
+
+
+def test_map_configs_orders_results_and_fans_out(console):
+    split_keys = {"op_a": "text_a", "op_b": "text_b", "op_c": "text_c"}
+    llm_client = StubLLMClient(
+        {name: _payload(split_key) for name, split_key in split_keys.items()}
+    )
+    generator = ConfigGenerator(llm_client, console, config={}, max_threads=4)
+
+    op_configs = [_op_config(name, key) for name, key in split_keys.items()]
+    samples = [_sample(key) for key in split_keys.values()]
+
+    results = asyncio.run(generator.map_configs(op_configs, samples, token_limit=1000))
+
+    # Results align with the op order regardless of completion order
+    assert [r["split"]["split_key"] for r in results] == list(split_keys.values())
+    for result in results:
+        assert result["chunk_sizes"] == sorted(result["chunk_sizes"])
+        assert result["metadata"]["needs_metadata"] is False
+        assert result["context"]["needs_peripherals"] is False
+
+    # The three analyses were in flight concurrently, not serialized
+    assert llm_client.max_in_flight == 3
+
+
+def test_analyze_op_reuses_cached_analysis(console):
+    llm_client = StubLLMClient({"op_a": _payload("text")})
+    generator = ConfigGenerator(llm_client, console, config={}, max_threads=4)
+    op_config = _op_config("op_a", "text")
+    sample = _sample("text")
+
+    first = asyncio.run(generator.analyze_op(op_config, sample, token_limit=1000))
+    second = asyncio.run(generator.analyze_op(op_config, sample, token_limit=1000))
+
+    # The combined request ran once; the second analysis hit the cache
+    assert llm_client.calls == ["op_a"]
+    assert second["split"] == first["split"]
@@ -0,0 +1,114 @@
+import io
+import json
+
+import pytest
+from rich.console import Console
+
+from docetl.optimizers import llm_cache
+from docetl.optimizers.map_optimizer.config_generators import (
+    ConfigGenerator,
+    _slice_words,
+    _word_spans,
+    word_count,
+)
+from docetl.utils import extract_jinja_variables
+
+
+@pytest.fixture
+def generator():
+    # The pure helpers under test never touch the LLM client
+    return ConfigGenerator(
+        llm_client=None, console=Console(file=io.StringIO()), config={}, max_threads=4
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "one",
+        "a b c",
+        "a\nb\nc",
+        "  leading and trailing  ",
+        "tabs\tand\nnewlines mixed   spaces",
+    ],
+)
+def test_word_spans_match_str_split(text):
+    words = text.split()
+    spans = _word_spans(text)
+    assert [text[start:end] for start, end in spans] == words
+    assert word_count(text) == len(words)
+
+
+def test_slice_words_covers_word_ranges():
+    text = "  the quick\nbrown fox jumps\tover the lazy dog "
+    words = text.split()
+    spans = _word_spans(text)
+
+    assert _slice_words(text, spans, 0, len(spans)).split() == words
+    assert _slice_words(text, spans, 2, 5).split() == words[2:5]
+    # Ranges past the end are clamped; empty or inverted ranges yield ""
+    assert _slice_words(text, spans, 5, 50).split() == words[5:]
+    assert _slice_words(text, spans, len(spans), len(spans) + 3) == ""
+    assert _slice_words(text, spans, 3, 3) == ""
+    assert _slice_words("", [], 0, 5) == ""
+
+
+def test_slice_words_partitions_text_into_chunks():
+    text = "word " * 103
+    spans = _word_spans(text)
+    chunks = [_slice_words(text, spans, i, i + 10) for i in range(0, len(spans), 10)]
+    assert len(chunks) == 11
+    assert sum(word_count(chunk) for chunk in chunks) == 103
+
+
+def test_peripheral_configs_start_with_empty_and_deduplicate(generator):
+    configs = generator._generate_peripheral_configs("summary", 100, 1000)
+    assert configs[0] == ({}, False)
+    unique = {(json.dumps(c, sort_keys=True), s) for c, s in configs}
+    assert len(unique) == len(configs)
+    # chunk_size < avg_doc_size / 5, so summary configs are present
+    summary_configs = [c for c, needs_summary in configs if needs_summary]
+    assert summary_configs
+    for config in summary_configs:
+        assert config["previous"]["middle"]["content_key"] == "summary"
+
+
+def test_peripheral_configs_are_independently_mutable(generator):
+    first = generator._generate_peripheral_configs("summary", 50, 1000)
+    first[1][0]["previous"]["tail"]["count"] = 999
+    second = generator._generate_peripheral_configs("summary", 50, 1000)
+    assert second[1][0]["previous"]["tail"]["count"] != 999
+
+
+def test_cache_key_is_stable_and_sensitive():
+    messages = [{"role": "user", "content": "hello"}]
+    key = llm_cache.cache_key("gpt-4o", "system", messages, {"a": 1, "b": 2})
+    # Parameter ordering does not change the key
+    assert key == llm_cache.cache_key("gpt-4o", "system", messages, {"b": 2, "a": 1})
+    # Changing any component does
+    assert key != llm_cache.cache_key(
+        "gpt-4o-mini", "system", messages, {"a": 1, "b": 2}
+    )
+    assert key != llm_cache.cache_key(
+        "gpt-4o", "system", [{"role": "user", "content": "bye"}], {"a": 1, "b": 2}
+    )
+
+
+def test_cached_response_roundtrip(tmp_path, monkeypatch):
+    from diskcache import Cache
+
+    monkeypatch.setattr(llm_cache, "agent_llm_cache", Cache(str(tmp_path / "cache")))
+    key = llm_cache.cache_key("gpt-4o", "system", [], {})
+    assert llm_cache.get_cached_response(key) is None
+    llm_cache.set_cached_response(key, {"answer": 42})
+    assert llm_cache.get_cached_response(key) == {"answer": 42}
+
+
+def test_extract_jinja_variables_returns_fresh_lists():
+    template = "{{ input.text }} and {{ other }}"
+    first = extract_jinja_variables(template)
+    assert sorted(first) == ["input.text", "other"]
+    # The cached tuple must not be observable through a caller's mutation
+    first.append("mutated")
+    assert "mutated" not in extract_jinja_variables(template)